@@ -3,119 +3,74 @@
 百人一首の試合データを生成してExcelファイルに保存
 """
 
+import numpy as np
 import pandas as pd
-import random
 
 def create_sample_data():
     """サンプルの試合データを作成"""
     
     # プレイヤー名リスト
-    players = [
+    players = np.array([
         "田中太郎", "佐藤花子", "鈴木一郎", "高橋美咲", "伊藤健太",
         "渡辺由美", "山本達也", "中村さくら", "小林真一", "加藤愛美",
         "吉田隆司", "山田純子", "佐々木修", "松本麻衣", "井上康夫",
         "木村優子", "林大輔", "清水奈々", "森田浩二", "池田美穂"
-    ]
+    ])
     
-    matches = []
+    rng = np.random.default_rng()
     
     # 実際に実施した試合数（例：7試合のみ実施）
     actual_matches = 7
+    match_nums = np.arange(1, actual_matches + 1)
     
-    # 実施した試合分のデータを生成
-    for match_num in range(1, actual_matches + 1):
-        # ランダムに2人を選択（重複なし）
-        player_pair = random.sample(players, 2)
-        player_a = player_pair[0]
-        player_b = player_pair[1]
-        
-        # 3試合目は必ず同枚数（8-8）にする
-        if match_num == 3:
-            cards_a = 8
-            cards_b = 8
-            # 同枚数の場合、残り4枚で勝負（獲得札数には加算しない）
-            # どちらかが必ず勝利
-            if random.random() < 0.5:
-                result_a = "勝"
-                result_b = "負"
-            else:
-                result_a = "負"
-                result_b = "勝"
-        # 獲得札数を生成（合計20枚、最高17枚）
-        # 他の試合では10-10の同枚数になる確率を考慮
-        elif random.random() < 0.1:  # 10%の確率で同枚数（10-10）
-            cards_a = 10
-            cards_b = 10
-            # 同枚数の場合、残り3枚で勝負（獲得札数には加算しない）
-            # どちらかが必ず勝利
-            if random.random() < 0.5:
-                result_a = "勝"
-                result_b = "負"
-            else:
-                result_a = "負"
-                result_b = "勝"
-        else:
-            # 通常の勝負
-            # 80%の確率で通常試合（17枚を先に取った方が勝利）
-            # 20%の確率でお手つき等で早期終了（合計17枚未満）
-            if random.random() < 0.8:
-                # 通常試合：17枚を先に取った方が勝利
-                winner_cards = random.randint(11, 17)
-                loser_cards = 17 - winner_cards
-            else:
-                # お手つき等で早期終了：合計10-16枚
-                total_taken = random.randint(10, 16)
-                winner_cards = random.randint(max(6, (total_taken + 1) // 2), min(17, total_taken - 1))
-                loser_cards = total_taken - winner_cards
-            
-            # どちらが勝者かをランダムに決定
-            if random.random() < 0.5:
-                cards_a = winner_cards
-                cards_b = loser_cards
-                result_a = "勝"
-                result_b = "負"
-            else:
-                cards_a = loser_cards
-                cards_b = winner_cards
-                result_a = "負"
-                result_b = "勝"
-        
-        # プレイヤーAの記録
-        matches.append({
-            "試合番号": match_num,
-            "名前": player_a,
-            "相手": player_b,
-            "結果": result_a,
-            "獲得札数": cards_a
-        })
-        
-        # プレイヤーBの記録
-        matches.append({
-            "試合番号": match_num,
-            "名前": player_b,
-            "相手": player_a,
-            "結果": result_b,
-            "獲得札数": cards_b
-        })
+    # 実施した試合分のデータを一括で生成
+    # ランダムに2人を選択（重複なし）
+    pair_idx = rng.permuted(np.tile(np.arange(len(players)), (actual_matches, 1)), axis=1)[:, :2]
+    
+    # 獲得札数を生成（合計20枚、最高17枚）
+    # 80%の確率で通常試合（17枚を先に取った方が勝利）
+    # 20%の確率でお手つき等で早期終了（合計10-16枚）
+    is_early_end = rng.random(actual_matches) >= 0.8
+    total_taken = rng.integers(10, 17, actual_matches)
+    early_winner_cards = rng.integers(np.maximum(6, (total_taken + 1) // 2),
+                                      np.minimum(17, total_taken - 1) + 1)
+    winner_cards = np.where(is_early_end, early_winner_cards, rng.integers(11, 18, actual_matches))
+    loser_cards = np.where(is_early_end, total_taken, 17) - winner_cards
+    
+    # 3試合目は必ず同枚数（8-8）、他の試合は10%の確率で同枚数（10-10）
+    # 同枚数の場合、残り札で勝負（獲得札数には加算しない）
+    is_forced_tie = match_nums == 3
+    is_tie = is_forced_tie | (rng.random(actual_matches) < 0.1)
+    tie_cards = np.where(is_forced_tie, 8, 10)
+    winner_cards = np.where(is_tie, tie_cards, winner_cards)
+    loser_cards = np.where(is_tie, tie_cards, loser_cards)
+    
+    # どちらが勝者かをランダムに決定
+    a_wins = rng.random(actual_matches) < 0.5
+    cards_a = np.where(a_wins, winner_cards, loser_cards)
+    cards_b = np.where(a_wins, loser_cards, winner_cards)
+    result_a = np.where(a_wins, "勝", "負")
+    result_b = np.where(a_wins, "負", "勝")
+    
+    # 1試合につきプレイヤーA・Bの2行を交互に並べる
+    played = pd.DataFrame({
+        "試合番号": np.repeat(match_nums, 2),
+        "名前": players[pair_idx.ravel()],
+        "相手": players[pair_idx[:, ::-1].ravel()],
+        "結果": np.column_stack([result_a, result_b]).ravel(),
+        "獲得札数": np.column_stack([cards_a, cards_b]).ravel()
+    })
     
     # 残りの試合（8-10試合目）は試合番号のみでブランク行を追加
-    for match_num in range(actual_matches + 1, 11):
-        matches.append({
-            "試合番号": match_num,
-            "名前": None,
-            "相手": None,
-            "結果": None,
-            "獲得札数": None
-        })
-        matches.append({
-            "試合番号": match_num,
-            "名前": None,
-            "相手": None,
-            "結果": None,
-            "獲得札数": None
-        })
+    blank = pd.DataFrame({
+        "試合番号": np.repeat(np.arange(actual_matches + 1, 11), 2),
+        "名前": np.nan,
+        "相手": np.nan,
+        "結果": np.nan,
+        "獲得札数": np.nan
+    })
     
-    return pd.DataFrame(matches)
+    return pd.concat([played, blank], ignore_index=True)
 
 def main():
     """サンプルデータを生成してExcelファイルに保存"""
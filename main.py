@@ -8,7 +8,248 @@ import pandas as pd
 import numpy as np
 from typing import Dict, List, Tuple
 import argparse
+import math
 import sys
+from collections import defaultdict
+
+# 10 ** (x / 400) = exp(x * ln(10) / 400) として期待勝率を計算するための係数
+_ELO_SCALE = math.log(10) / 400.0
+
+# 試合結果の表記 → 勝敗の符号（勝=1, 負=-1、該当しない表記は0）
+_RESULT_MAP = {"勝": 1, "勝利": 1, "〇": 1, "負": -1, "敗北": -1, "✕": -1}
+
+
+def expected_score(rating_a: float, rating_b: float) -> float:
+    """
+    期待勝率を計算（Eloレーティングシステム、run_pipelineからも使用）
+    
+    Args:
+        rating_a: プレイヤーAのレーティング
+        rating_b: プレイヤーBのレーティング
+        
+    Returns:
+        プレイヤーAの期待勝率
+    """
+    return 1.0 / (1.0 + math.exp((rating_b - rating_a) * _ELO_SCALE))
+
+
+def performance_score(sign: int, cards_won: int, cards_lost: int, card_weight: float) -> float:
+    """
+    獲得札数を考慮した実際のスコアを計算（run_pipelineからも使用）
+    
+    Args:
+        sign: 試合結果（勝=1, 負=-1, その他=0）
+        cards_won: 獲得札数
+        cards_lost: 相手の獲得札数
+        card_weight: 獲得札数の重み
+        
+    Returns:
+        実際のスコア（0.0-1.0）
+    """
+    # 基本スコア（勝敗による、念のため引き分けは0.5として扱う）
+    base_score = 0.5 + 0.5 * sign
+    
+    # 獲得札数による調整スコア（17枚制または同枚数時の20枚制）
+    total_cards = cards_won + cards_lost
+    if total_cards > 0:
+        card_ratio = cards_won / total_cards
+    else:
+        card_ratio = 0.5
+    
+    # 同枚数の場合の特別処理
+    if cards_won == cards_lost:
+        # 同枚数の場合は獲得札数の影響を軽減
+        # 勝敗のみで判定（残り札での勝負結果）
+        return base_score
+    
+    # 重み付きスコア（基本スコア + 札数スコア）
+    final_score = (1 - card_weight) * base_score + card_weight * card_ratio
+    
+    # 0.0-1.0の範囲に収める
+    return max(0.0, min(1.0, final_score))
+
+
+# 試合履歴の列名 → 型（プレイヤーは名前ではなくIDで記録）
+_HISTORY_DTYPES = {
+    'player_a_id': np.int32,
+    'player_b_id': np.int32,
+    'result_a': object,
+    'cards_a': np.int32,
+    'cards_b': np.int32,
+    'actual_score_a': np.float64,
+    'expected_score_a': np.float64,
+    'rating_a_before': np.float64,
+    'rating_b_before': np.float64,
+    'rating_a_after': np.float64,
+    'rating_b_after': np.float64
+}
+
+# run_pipelineが試合ごとに記録する判定結果
+_MATCH_OK = 0
+_OPPONENT_NOT_FOUND = 1
+_OPPONENT_MISMATCH = 2
+_RESULT_CONFLICT = 3
+
+
+def run_pipeline(ida, idb, opp_a, opp_b, cards_a, cards_b, sign_a, sign_b,
+                 player_ids, n_players, initial_rating, ratings, wins, losses,
+                 k_factor, card_weight, status,
+                 hist_player_a, hist_player_b, hist_cards_a, hist_cards_b,
+                 expected_a, actual_a, rating_a_before, rating_b_before,
+                 rating_a_after, rating_b_after):
+    """
+    試合の整合性チェック・レーティング更新・勝敗記録・試合履歴の記録を
+    1回のループで行う（試合数が多い場合は_select_pipelineでnumbaによりコンパイルして実行）
+    
+    Args:
+        ida, idb: 各試合の1行目・2行目の名前（データ内ID）
+        opp_a, opp_b: 各試合の1行目・2行目の相手（データ内ID）
+        cards_a, cards_b: 1行目・2行目の獲得札数
+        sign_a, sign_b: 1行目・2行目の結果（勝=1, 負=-1, その他=0）
+        player_ids: データ内ID → プレイヤーID（未登録は-1、使われた時点で採番）
+        n_players: 登録済みプレイヤー数
+        initial_rating: 初期レーティング
+        ratings, wins, losses: プレイヤーIDごとの配列（その場で更新）
+        k_factor: K値
+        card_weight: 獲得札数の重み
+        status: 試合ごとの判定結果を書き込む配列
+        hist_player_a 以降: 試合履歴を書き込む配列（試合数分を確保済み）
+        
+    Returns:
+        （更新後の登録済みプレイヤー数, 試合履歴に記録した試合数）
+    """
+    n_hist = 0
+    for m in range(len(ida)):
+        # データ整合性チェック
+        if idb[m] != opp_a[m]:
+            status[m] = _OPPONENT_NOT_FOUND
+            continue
+        if opp_b[m] != ida[m]:
+            status[m] = _OPPONENT_MISMATCH
+            continue
+        if sign_a[m] != 0 and sign_b[m] != -sign_a[m]:
+            status[m] = _RESULT_CONFLICT
+            continue
+        status[m] = _MATCH_OK
+        
+        # 初回参加者の場合、IDを採番して初期レーティングを設定
+        if player_ids[ida[m]] < 0:
+            player_ids[ida[m]] = n_players
+            ratings[n_players] = initial_rating
+            wins[n_players] = 0
+            losses[n_players] = 0
+            n_players += 1
+        if player_ids[idb[m]] < 0:
+            player_ids[idb[m]] = n_players
+            ratings[n_players] = initial_rating
+            wins[n_players] = 0
+            losses[n_players] = 0
+            n_players += 1
+        a = player_ids[ida[m]]
+        b = player_ids[idb[m]]
+        
+        rating_a = ratings[a]
+        rating_b = ratings[b]
+        
+        expected = expected_score(rating_a, rating_b)
+        actual = performance_score(sign_a[m], cards_a[m], cards_b[m], card_weight)
+        
+        new_rating_a = rating_a + k_factor * (actual - expected)
+        new_rating_b = rating_b + k_factor * ((1 - actual) - (1 - expected))
+        ratings[a] = new_rating_a
+        ratings[b] = new_rating_b
+        
+        # 勝敗記録を更新
+        if sign_a[m] > 0:
+            wins[a] += 1
+            losses[b] += 1
+        elif sign_a[m] < 0:
+            losses[a] += 1
+            wins[b] += 1
+        
+        # 試合履歴を記録
+        hist_player_a[n_hist] = a
+        hist_player_b[n_hist] = b
+        hist_cards_a[n_hist] = cards_a[m]
+        hist_cards_b[n_hist] = cards_b[m]
+        expected_a[n_hist] = expected
+        actual_a[n_hist] = actual
+        rating_a_before[n_hist] = rating_a
+        rating_b_before[n_hist] = rating_b
+        rating_a_after[n_hist] = new_rating_a
+        rating_b_after[n_hist] = new_rating_b
+        n_hist += 1
+    
+    return n_players, n_hist
+
+
+# この試合数以上の場合のみrun_pipelineをnumbaでコンパイルして実行
+# （試合数が少ない場合はnumbaの読み込みとコンパイルの方が時間がかかるため）
+_JIT_MIN_MATCHES = 100_000
+
+_compiled_run_pipeline = None
+
+
+def _select_pipeline(n_matches: int):
+    """
+    試合数に応じてrun_pipelineの実行方法を選ぶ
+    
+    Args:
+        n_matches: 処理する試合数
+        
+    Returns:
+        試合数が多くnumbaが使える場合はコンパイルしたrun_pipeline、それ以外はrun_pipelineそのもの
+    """
+    global _compiled_run_pipeline
+    if n_matches < _JIT_MIN_MATCHES:
+        return run_pipeline
+    if _compiled_run_pipeline is None:
+        try:
+            from numba import njit
+            from numba.extending import register_jitable
+        except ImportError:
+            # numbaが無い環境ではPythonのまま実行
+            _compiled_run_pipeline = run_pipeline
+        else:
+            # run_pipelineから呼び出す関数はPythonからも使えるようにそのまま登録する
+            register_jitable(expected_score)
+            register_jitable(performance_score)
+            # コンパイル結果は__pycache__にキャッシュし、次回以降の実行ではコンパイルを省略
+            _compiled_run_pipeline = njit(cache=True)(run_pipeline)
+    return _compiled_run_pipeline
+
+
+def read_excel(file_path: str, **kwargs) -> pd.DataFrame:
+    """
+    Excelファイルを読み込み（calamineエンジンを優先し、未インストールの場合はopenpyxlを使用）
+    
+    Args:
+        file_path: Excelファイルのパス
+        **kwargs: pd.read_excelに渡す引数
+        
+    Returns:
+        読み込んだDataFrame
+    """
+    try:
+        return pd.read_excel(file_path, engine='calamine', **kwargs)
+    except ImportError:
+        return pd.read_excel(file_path, engine='openpyxl', **kwargs)
+
+
+def excel_writer(output_file: str) -> pd.ExcelWriter:
+    """
+    Excel書き込み用のWriterを作成（xlsxwriterを優先し、未インストールの場合はopenpyxlを使用）
+    
+    Args:
+        output_file: 出力ファイルのパス
+        
+    Returns:
+        ExcelWriter
+    """
+    try:
+        return pd.ExcelWriter(output_file, engine='xlsxwriter')
+    except ImportError:
+        return pd.ExcelWriter(output_file, engine='openpyxl')
 
 
 class HyakuninisshuRating:
@@ -26,9 +267,90 @@ class HyakuninisshuRating:
         self.initial_rating = initial_rating
         self.k_factor = k_factor
         self.card_weight = card_weight
-        self.player_ratings = {}
-        self.player_stats = {}  # 勝敗記録を追跡
-        self.match_history = []
+        # プレイヤーごとの値はIDで引く配列で保持（容量は2倍ずつ拡張し、先頭_n_players件が有効）
+        self._name_to_id = {}
+        self._n_players = 0
+        self._names = np.empty(0, dtype=object)
+        self._ratings = np.empty(0, dtype=np.float64)
+        self._wins = np.zeros(0, dtype=np.int32)  # 勝敗記録を追跡
+        self._losses = np.zeros(0, dtype=np.int32)
+        self._hist_cols = defaultdict(list)  # 試合履歴（列名 → 処理単位ごとの配列のリスト）
+        self._hist_rows = defaultdict(list)  # update_ratingsで1試合ずつ記録した履歴（列名 → 値のリスト）
+    
+    def _reserve(self, n_players: int):
+        """
+        プレイヤー配列の容量を確保（不足する場合は2倍ずつ拡張）
+        
+        Args:
+            n_players: 必要なプレイヤー数
+        """
+        capacity = len(self._ratings)
+        if n_players <= capacity:
+            return
+        capacity = max(2 * capacity, n_players, 16)
+        self._names = np.resize(self._names, capacity)
+        self._ratings = np.resize(self._ratings, capacity)
+        self._wins = np.resize(self._wins, capacity)
+        self._losses = np.resize(self._losses, capacity)
+    
+    def _intern(self, name: str) -> int:
+        """
+        プレイヤー名をIDに変換（初回参加者は初期レーティングで登録）
+        
+        Args:
+            name: プレイヤー名
+            
+        Returns:
+            プレイヤーID
+        """
+        # 名前は辞書のキーとして比較されるため、同じ文字列オブジェクトを共有させる
+        name = sys.intern(name)
+        player_id = self._name_to_id.get(name)
+        if player_id is not None:
+            return player_id
+        
+        player_id = self._n_players
+        self._reserve(player_id + 1)
+        
+        self._names[player_id] = name
+        self._ratings[player_id] = self.initial_rating
+        self._wins[player_id] = 0
+        self._losses[player_id] = 0
+        self._name_to_id[name] = player_id
+        self._n_players += 1
+        return player_id
+    
+    def _allocate_history(self, n_matches: int) -> Dict[str, np.ndarray]:
+        """
+        試合履歴の列配列を確保
+        
+        Args:
+            n_matches: 記録する試合数
+            
+        Returns:
+            列名 → 配列の辞書（プレイヤーは名前ではなくIDで記録）
+        """
+        return {column: np.empty(n_matches, dtype=dtype) for column, dtype in _HISTORY_DTYPES.items()}
+    
+    def _flush_history_rows(self):
+        """update_ratingsで1試合ずつ記録した履歴を列配列にまとめて試合履歴に追加"""
+        if not self._hist_rows:
+            return
+        for column, dtype in _HISTORY_DTYPES.items():
+            self._hist_cols[column].append(np.array(self._hist_rows[column], dtype=dtype))
+        self._hist_rows.clear()
+    
+    def _record_history(self, hist: Dict[str, np.ndarray]):
+        """
+        記録済みの試合履歴を列ごとに追加
+        
+        Args:
+            hist: _allocate_historyで確保して値を書き込んだ列配列の辞書
+        """
+        # 記録順を保つため、先に1試合ずつ記録した履歴を追加
+        self._flush_history_rows()
+        for column, values in hist.items():
+            self._hist_cols[column].append(values)
     
     def calculate_expected_score(self, rating_a: float, rating_b: float) -> float:
         """
@@ -41,7 +363,7 @@ class HyakuninisshuRating:
         Returns:
             プレイヤーAの期待勝率
         """
-        return 1 / (1 + 10 ** ((rating_b - rating_a) / 400))
+        return expected_score(rating_a, rating_b)
     
     def calculate_performance_score(self, result: str, cards_won: int, cards_lost: int) -> float:
         """
@@ -55,32 +377,7 @@ class HyakuninisshuRating:
         Returns:
             実際のスコア（0.0-1.0）
         """
-        # 基本スコア（勝敗による）
-        if result == "勝利" or result == "勝" or result == "〇":
-            base_score = 1.0
-        elif result == "敗北" or result == "負" or result == "✕":
-            base_score = 0.0
-        else:  # 念のため引き分けにも対応（実際は発生しない）
-            base_score = 0.5
-        
-        # 獲得札数による調整スコア（17枚制または同枚数時の20枚制）
-        total_cards = cards_won + cards_lost
-        if total_cards > 0:
-            card_ratio = cards_won / total_cards
-        else:
-            card_ratio = 0.5
-        
-        # 同枚数の場合の特別処理
-        if cards_won == cards_lost:
-            # 同枚数の場合は獲得札数の影響を軽減
-            # 勝敗のみで判定（残り札での勝負結果）
-            return base_score
-        
-        # 重み付きスコア（基本スコア + 札数スコア）
-        final_score = (1 - self.card_weight) * base_score + self.card_weight * card_ratio
-        
-        # 0.0-1.0の範囲に収める
-        return max(0.0, min(1.0, final_score))
+        return performance_score(_RESULT_MAP.get(result, 0), cards_won, cards_lost, self.card_weight)
     
     def update_ratings(self, player_a: str, player_b: str, result_a: str, 
                       cards_a: int, cards_b: int) -> Tuple[float, float]:
@@ -98,16 +395,12 @@ class HyakuninisshuRating:
             更新後の（プレイヤーAレーティング, プレイヤーBレーティング）
         """
         # 初回参加者の場合、初期レーティングを設定
-        if player_a not in self.player_ratings:
-            self.player_ratings[player_a] = self.initial_rating
-            self.player_stats[player_a] = {'wins': 0, 'losses': 0}
-        if player_b not in self.player_ratings:
-            self.player_ratings[player_b] = self.initial_rating
-            self.player_stats[player_b] = {'wins': 0, 'losses': 0}
+        id_a = self._intern(player_a)
+        id_b = self._intern(player_b)
         
         # 現在のレーティング
-        rating_a = self.player_ratings[player_a]
-        rating_b = self.player_ratings[player_b]
+        rating_a = float(self._ratings[id_a])
+        rating_b = float(self._ratings[id_b])
         
         # 期待勝率を計算
         expected_a = self.calculate_expected_score(rating_a, rating_b)
@@ -122,33 +415,31 @@ class HyakuninisshuRating:
         new_rating_b = rating_b + self.k_factor * (actual_score_b - expected_b)
         
         # レーティングを保存
-        self.player_ratings[player_a] = new_rating_a
-        self.player_ratings[player_b] = new_rating_b
+        self._ratings[id_a] = new_rating_a
+        self._ratings[id_b] = new_rating_b
         
         # 勝敗記録を更新
-        if result_a == "勝" or result_a == "勝利" or result_a == "〇":
-            self.player_stats[player_a]['wins'] += 1
-            self.player_stats[player_b]['losses'] += 1
-        elif result_a == "負" or result_a == "敗北" or result_a == "✕":
-            self.player_stats[player_a]['losses'] += 1
-            self.player_stats[player_b]['wins'] += 1
+        sign = _RESULT_MAP.get(result_a, 0)
+        if sign > 0:
+            self._wins[id_a] += 1
+            self._losses[id_b] += 1
+        elif sign < 0:
+            self._losses[id_a] += 1
+            self._wins[id_b] += 1
         
         # 試合履歴を記録
-        self.match_history.append({
-            'player_a': player_a,
-            'player_b': player_b,
-            'result_a': result_a,
-            'cards_a': cards_a,
-            'cards_b': cards_b,
-            'actual_score_a': actual_score_a,
-            'expected_score_a': expected_a,
-            'rating_a_before': rating_a,
-            'rating_b_before': rating_b,
-            'rating_a_after': new_rating_a,
-            'rating_b_after': new_rating_b,
-            'rating_change_a': new_rating_a - rating_a,
-            'rating_change_b': new_rating_b - rating_b
-        })
+        hist = self._hist_rows
+        hist['player_a_id'].append(id_a)
+        hist['player_b_id'].append(id_b)
+        hist['result_a'].append(result_a)
+        hist['cards_a'].append(cards_a)
+        hist['cards_b'].append(cards_b)
+        hist['actual_score_a'].append(actual_score_a)
+        hist['expected_score_a'].append(expected_a)
+        hist['rating_a_before'].append(rating_a)
+        hist['rating_b_before'].append(rating_b)
+        hist['rating_a_after'].append(new_rating_a)
+        hist['rating_b_after'].append(new_rating_b)
         
         return new_rating_a, new_rating_b
     
@@ -164,11 +455,15 @@ class HyakuninisshuRating:
             試合データのDataFrame
         """
         try:
-            if sheet_name is None:
-                # シート名が指定されていない場合は最初のシートを読み込み
-                df = pd.read_excel(file_path, sheet_name=0)
-            else:
-                df = pd.read_excel(file_path, sheet_name=sheet_name)
+            # シート名が指定されていない場合は最初のシートを読み込み
+            # 必要な列のみを型を指定して読み込む
+            df = read_excel(
+                file_path,
+                sheet_name=0 if sheet_name is None else sheet_name,
+                usecols=['試合番号', '名前', '相手', '結果', '獲得札数'],
+                dtype={'名前': 'string', '相手': 'string',
+                       '結果': 'category', '獲得札数': 'Int32'}
+            )
             return df
         except Exception as e:
             print(f"Excelファイルの読み込みエラー: {e}")
@@ -183,17 +478,19 @@ class HyakuninisshuRating:
         """
         try:
             # レーティングシートを読み込み
-            ratings_df = pd.read_excel(file_path, sheet_name='レーティング')
+            ratings_df = read_excel(
+                file_path,
+                sheet_name='レーティング',
+                usecols=['player', 'rating', 'wins', 'losses'],
+                dtype={'player': 'string', 'rating': 'float64', 'wins': 'int32', 'losses': 'int32'}
+            )
             
             print(f"前月のレーティングデータを読み込み中: {file_path}")
-            for _, row in ratings_df.iterrows():
-                player = str(row['player']).strip()
-                rating = float(row['rating'])
-                wins = int(row['wins'])
-                losses = int(row['losses'])
-                
-                self.player_ratings[player] = rating
-                self.player_stats[player] = {'wins': wins, 'losses': losses}
+            players = ratings_df['player'].astype(str).str.strip()
+            player_ids = np.array([self._intern(player) for player in players], dtype=np.int32)
+            self._ratings[player_ids] = ratings_df['rating'].to_numpy(np.float64)
+            self._wins[player_ids] = ratings_df['wins'].to_numpy(np.int32)
+            self._losses[player_ids] = ratings_df['losses'].to_numpy(np.int32)
             
             print(f"前月データ読み込み完了: {len(ratings_df)}プレイヤー")
             
@@ -209,95 +506,181 @@ class HyakuninisshuRating:
             matches_df: 試合データのDataFrame
                        列: ['試合番号', '名前', '相手', '結果', '獲得札数']
         """
-        # 欠損値を含む行を除外
-        matches_df = matches_df.dropna(subset=['名前', '相手', '結果', '獲得札数'])
-        
-        # 名前と相手の前後の空白を除去
-        matches_df['名前'] = matches_df['名前'].astype(str).str.strip()
-        matches_df['相手'] = matches_df['相手'].astype(str).str.strip()
+        # 欠損値を含む行を除外（試合番号が無い行は試合として扱えないため同様に除外）
+        # DataFrame全体は複製せず、処理対象の行番号だけを求めて各列から取り出す
+        columns = ['試合番号', '名前', '相手', '結果', '獲得札数']
+        rows = np.flatnonzero(matches_df[columns].notna().all(axis=1).to_numpy())
         
-        if len(matches_df) == 0:
+        if len(rows) == 0:
             print("有効な試合データが見つかりません。")
             return
         
-        processed_pairs = set()  # 処理済みペアを記録
+        # 名前と相手をまとめてカテゴリ化し、前後の空白を除去した名前ごとの整数IDに変換
+        n_rows = len(rows)
+        players = pd.Categorical(np.concatenate([matches_df['名前'].to_numpy(object)[rows],
+                                                 matches_df['相手'].to_numpy(object)[rows]]))
+        category_ids, all_names = pd.factorize(players.categories.astype(str).str.strip())
+        player_codes = category_ids[players.codes]
+        name_ids = player_codes[:n_rows].astype(np.int32)
+        opp_ids = player_codes[n_rows:].astype(np.int32)
+        # 登録済みの名前と同一オブジェクトになるようにinternしておく
+        all_names = np.array([sys.intern(name) for name in all_names], dtype=object)
         
-        # 試合番号でグループ化して、1試合ずつ処理
-        for match_num, group in matches_df.groupby('試合番号'):
-            print(f"\n=== 試合{match_num} ===")
+        # 同じ試合番号・同じ2人の組み合わせの行をまとめる
+        # （1つの試合番号に複数の対戦がある場合も、対戦ごとに2行の組として扱う）
+        nums = matches_df['試合番号'].iloc[rows].to_numpy()
+        num_codes = pd.factorize(nums, sort=True)[0]
+        low_ids, high_ids = np.minimum(name_ids, opp_ids), np.maximum(name_ids, opp_ids)
+        order = np.lexsort((high_ids, low_ids, num_codes))
+        key_changed = ((np.diff(num_codes[order]) != 0) | (np.diff(low_ids[order]) != 0)
+                       | (np.diff(high_ids[order]) != 0))
+        starts = np.flatnonzero(np.r_[True, key_changed])
+        counts = np.diff(np.r_[starts, n_rows])
+        
+        # 対戦を試合番号順・試合内での登場順に並べ替え（対戦内の行の順序は維持）
+        first_rows = order[starts]
+        group_order = np.lexsort((first_rows, num_codes[first_rows]))
+        group_rank = np.empty(len(starts), dtype=np.int64)
+        group_rank[group_order] = np.arange(len(starts))
+        order = order[np.argsort(np.repeat(group_rank, counts), kind='stable')]
+        counts, first_rows = counts[group_order], first_rows[group_order]
+        
+        # 2行でない対戦は警告を表示（警告は対戦の順番で表示）
+        # 3行以上ある対戦は最初の行と、その相手側の最初の行の2行だけを1試合として使う
+        group_nums = nums[first_rows]
+        group_starts = np.r_[0, np.cumsum(counts)[:-1]]
+        keep = np.repeat(counts == 2, counts)
+        n_pairs = (counts == 2).astype(np.int64)
+        group_warnings = {}
+        if (counts == 1).any():
+            opponent_of = {(num, name): opp for num, name, opp in zip(num_codes, name_ids, opp_ids)}
+        for g in np.flatnonzero(counts != 2):
+            first = first_rows[g]
+            player, opponent = all_names[name_ids[first]], all_names[opp_ids[first]]
+            if counts[g] > 1:
+                group_warnings[g] = f"警告: 試合{nums[first]}の{player} vs {opponent}のデータが{counts[g]}行あります（1対戦につき2行である必要があります）"
+                positions = group_starts[g] + np.arange(counts[g])
+                other_side = positions[name_ids[order[positions]] != name_ids[first]]
+                if len(other_side):
+                    keep[[group_starts[g], other_side[0]]] = True
+                    n_pairs[g] = 1
+            elif (num_codes[first], opp_ids[first]) in opponent_of:
+                opponent_opponent = all_names[opponent_of[(num_codes[first], opp_ids[first])]]
+                group_warnings[g] = f"警告: {player} vs {opponent}の相手データが一致しません（{opponent} -> {opponent_opponent}）"
+            else:
+                group_warnings[g] = f"警告: {player}の相手{opponent}のデータが見つかりません"
+        order = order[keep]
+        rows, nums, name_ids, opp_ids = rows[order], nums[order], name_ids[order], opp_ids[order]
+        
+        # 結果の表記を勝敗の符号に変換（空白除去と変換はカテゴリ＝重複しない表記に対してのみ行う）
+        results = matches_df['結果'].iloc[rows].astype('category')
+        result_signs = results.cat.categories.astype(str).str.strip().map(_RESULT_MAP).fillna(0).to_numpy(np.int8)
+        signs = result_signs[results.cat.codes.to_numpy()]
+        sign_a, sign_b = signs[0::2], signs[1::2]
+        
+        # 各対戦の2行を（偶数行, 奇数行）のペアとして取り出す
+        results_a = results.to_numpy()[0::2]
+        results_b = results.to_numpy()[1::2]
+        cards = matches_df['獲得札数'].iloc[rows].to_numpy(np.int32)
+        cards_a, cards_b = cards[0::2], cards[1::2]
+        names_a, opps_a, opps_b = all_names[name_ids[0::2]], all_names[opp_ids[0::2]], all_names[opp_ids[1::2]]
+        
+        # 登録済みプレイヤーはプレイヤーID、未登録は-1（試合で使われた時点で採番）
+        player_ids = np.array([self._name_to_id.get(name, -1) for name in all_names], dtype=np.int32)
+        self._reserve(self._n_players + np.count_nonzero(player_ids < 0))
+        
+        # 整合性チェック・レーティング更新・勝敗記録・試合履歴の記録を一括で実行
+        n_matches = len(sign_a)
+        status = np.empty(n_matches, dtype=np.int8)
+        hist = self._allocate_history(n_matches)
+        n_players, n_hist = _select_pipeline(n_matches)(
+            name_ids[0::2], name_ids[1::2], opp_ids[0::2], opp_ids[1::2],
+            cards_a, cards_b, sign_a, sign_b,
+            player_ids, self._n_players, float(self.initial_rating),
+            self._ratings, self._wins, self._losses,
+            float(self.k_factor), float(self.card_weight), status,
+            hist['player_a_id'], hist['player_b_id'], hist['cards_a'], hist['cards_b'],
+            hist['expected_score_a'], hist['actual_score_a'],
+            hist['rating_a_before'], hist['rating_b_before'],
+            hist['rating_a_after'], hist['rating_b_after'])
+        # 記録された試合が無い場合は履歴を追加しない（空の試合履歴シートを作らないため）
+        if n_hist:
+            for column in hist:
+                hist[column] = hist[column][:n_hist]
+            hist['result_a'][:] = results_a[status == _MATCH_OK]
+            self._record_history(hist)
+        
+        # 新たに採番されたプレイヤーを登録
+        new_players = np.flatnonzero(player_ids >= self._n_players)
+        for i in new_players[np.argsort(player_ids[new_players])]:
+            self._names[player_ids[i]] = all_names[i]
+            self._name_to_id[all_names[i]] = int(player_ids[i])
+        self._n_players = n_players
+        
+        # 経過表示は1行ずつ出力せず、まとめて最後に書き出す
+        lines = []
+        next_match = 0
+        for g in range(len(counts)):
+            if g == 0 or group_nums[g] != group_nums[g - 1]:
+                lines.append(f"\n=== 試合{group_nums[g]} ===")
+            if g in group_warnings:
+                lines.append(group_warnings[g])
             
-            # 各プレイヤーのデータを処理
-            for _, player_data in group.iterrows():
-                player = player_data['名前']
-                opponent = player_data['相手']
-                result = player_data['結果']
-                cards = int(player_data['獲得札数'])
-                
-                # ペアの一意識別子を作成（アルファベット順で統一）
-                pair_id = tuple(sorted([player, opponent]))
-                match_pair_id = (match_num, pair_id)
-                
-                # 既に処理済みのペアはスキップ
-                if match_pair_id in processed_pairs:
-                    continue
-                
-                # 相手のデータを検索
-                opponent_data = group[group['名前'] == opponent]
-                if len(opponent_data) == 0:
-                    print(f"警告: {player}の相手{opponent}のデータが見つかりません")
-                    continue
-                
-                opponent_data = opponent_data.iloc[0]
-                opponent_result = opponent_data['結果']
-                opponent_cards = int(opponent_data['獲得札数'])
-                
-                # データ整合性チェック
-                if opponent_data['相手'] != player:
-                    print(f"警告: {player} vs {opponent}の相手データが一致しません（{opponent} -> {opponent_data['相手']}）")
-                    continue
-                
-                # 結果の整合性チェック
-                win_results = ["勝", "勝利", "〇"]
-                lose_results = ["負", "敗北", "✕"]
-                if (result in win_results and opponent_result not in lose_results) or (result in lose_results and opponent_result not in win_results):
-                    print(f"警告: {player} vs {opponent}の結果が矛盾しています（{result} vs {opponent_result}）")
-                    continue
-                
-                # レーティング更新
-                print(f"{player} vs {opponent} ({cards}-{opponent_cards}) - {player}: {result}")
-                self.update_ratings(player, opponent, result, cards, opponent_cards)
-                
-                # 処理済みペアとして記録
-                processed_pairs.add(match_pair_id)
+            for m in range(next_match, next_match + n_pairs[g]):
+                player, opponent = names_a[m], opps_a[m]
+                if status[m] == _OPPONENT_NOT_FOUND:
+                    lines.append(f"警告: {player}の相手{opponent}のデータが見つかりません")
+                elif status[m] == _OPPONENT_MISMATCH:
+                    lines.append(f"警告: {player} vs {opponent}の相手データが一致しません（{opponent} -> {opps_b[m]}）")
+                elif status[m] == _RESULT_CONFLICT:
+                    lines.append(f"警告: {player} vs {opponent}の結果が矛盾しています（{results_a[m]} vs {results_b[m]}）")
+                else:
+                    lines.append(f"{player} vs {opponent} ({cards_a[m]}-{cards_b[m]}) - {player}: {results_a[m]}")
+            next_match += n_pairs[g]
+        if lines:
+            sys.stdout.write('\n'.join(lines) + '\n')
     
     def get_current_ratings(self) -> Dict[str, float]:
         """現在のレーティングを取得"""
-        return self.player_ratings.copy()
+        n = self._n_players
+        return dict(zip(self._names[:n].tolist(), self._ratings[:n].tolist()))
     
     def get_ratings_table(self) -> pd.DataFrame:
         """レーティングテーブルをDataFrameで取得"""
-        ratings_list = [
-            {
-                'player': player, 
-                'rating': rating,
-                'wins': self.player_stats[player]['wins'],
-                'losses': self.player_stats[player]['losses']
-            }
-            for player, rating in sorted(self.player_ratings.items(), 
-                                       key=lambda x: x[1], reverse=True)
-        ]
-        return pd.DataFrame(ratings_list)
+        order = np.argsort(-self._ratings[:self._n_players], kind='stable')
+        return pd.DataFrame({
+            'player': self._names[order],
+            'rating': self._ratings[order],
+            'wins': self._wins[order],
+            'losses': self._losses[order]
+        })
     
     def save_results(self, output_file: str):
         """結果をExcelファイルに保存"""
-        with pd.ExcelWriter(output_file, engine='openpyxl') as writer:
+        with excel_writer(output_file) as writer:
             # レーティングテーブル
             ratings_df = self.get_ratings_table()
             ratings_df.to_excel(writer, sheet_name='レーティング', index=False)
             
             # 試合履歴
-            if self.match_history:
-                history_df = pd.DataFrame(self.match_history)
+            self._flush_history_rows()
+            if self._hist_cols:
+                hist = {column: np.concatenate(chunks) for column, chunks in self._hist_cols.items()}
+                history_df = pd.DataFrame({
+                    'player_a': self._names[hist['player_a_id']],
+                    'player_b': self._names[hist['player_b_id']],
+                    'result_a': hist['result_a'],
+                    'cards_a': hist['cards_a'],
+                    'cards_b': hist['cards_b'],
+                    'actual_score_a': hist['actual_score_a'],
+                    'expected_score_a': hist['expected_score_a'],
+                    'rating_a_before': hist['rating_a_before'],
+                    'rating_b_before': hist['rating_b_before'],
+                    'rating_a_after': hist['rating_a_after'],
+                    'rating_b_after': hist['rating_b_after'],
+                    'rating_change_a': hist['rating_a_after'] - hist['rating_a_before'],
+                    'rating_change_b': hist['rating_b_after'] - hist['rating_b_before']
+                })
                 history_df.to_excel(writer, sheet_name='試合履歴', index=False)
 
 
@@ -348,17 +731,19 @@ def main():
     ratings_table = rating_system.get_ratings_table()
     
     # カスタムフォーマットで表示（名前を右寄せ、日本語文字幅を考慮）
-    print("player      rating  wins/losses")
-    for _, row in ratings_table.iterrows():
-        player_name = str(row['player'])
-        # 日本語文字の表示幅を計算（全角文字は幅2、半角文字は幅1）
-        display_width = sum(2 if ord(c) > 127 else 1 for c in player_name)
-        # 10文字幅で右寄せ（日本語文字を考慮）
-        padding = 10 - display_width
-        formatted_name = ' ' * padding + player_name
-        rating = f"{row['rating']:.1f}"
-        wins_losses = f"{row['wins']}/{row['losses']}"
-        print(f"{formatted_name} {rating}  {wins_losses}")
+    player_names = [str(player) for player in ratings_table['player']]
+    # 日本語文字の表示幅を計算（全角文字は幅2、半角文字は幅1）
+    # 半角文字数はASCII以外を除いたエンコード長で一括して求める
+    display_widths = [2 * len(name) - len(name.encode('ascii', 'ignore')) for name in player_names]
+    # 10文字幅で右寄せ（日本語文字を考慮）し、表全体をまとめて出力
+    lines = ["player      rating  wins/losses"]
+    lines.extend(
+        f"{' ' * (10 - display_width) + player_name} {rating:.1f}  {wins}/{losses}"
+        for player_name, display_width, rating, wins, losses in zip(
+            player_names, display_widths, ratings_table['rating'],
+            ratings_table['wins'], ratings_table['losses'])
+    )
+    sys.stdout.write('\n'.join(lines) + '\n')
     
     # 結果をファイルに保存
     rating_system.save_results(args.output)